@@ -22,7 +22,7 @@ if __package__ is None or __package__ == "":
 
 from app.controllers.camera_controller import CameraController
 from app.controllers.face_controller import FaceController
-from app.models.camera_model import OpenCVCamera
+from app.models.camera_model import CameraInterface, OpenCVCamera, ThreadedCamera
 from app.models.insightface_service import InsightFaceService
 from app.utils.config import CONFIG
 from app.utils.helpers import measure_fps
@@ -56,19 +56,22 @@ def run() -> None:
     logger.info("Starting Face Recognition App")
     _ensure_running_in_venv()
 
-    camera = OpenCVCamera(
+    camera: CameraInterface = OpenCVCamera(
         index=CONFIG.video.camera_index,
         width=CONFIG.video.width,
         height=CONFIG.video.height,
     )
+    if CONFIG.video.threaded_capture:
+        camera = ThreadedCamera(camera)
     camera_controller = CameraController(camera=camera)
 
     if CONFIG.face.use_insightface:
         logger.info(
-            "Using InsightFace backend: model_pack='{}', ctx_id={}, det_size={}",
+            "Using InsightFace backend: model_pack='{}', ctx_id={}, det_size={}, tensorrt={}",
             CONFIG.face.insightface_model_pack,
             CONFIG.face.insightface_ctx_id,
             CONFIG.face.insightface_det_size,
+            CONFIG.face.insightface_use_tensorrt,
         )
         service = InsightFaceService(
             model_pack=CONFIG.face.insightface_model_pack,
@@ -76,6 +79,11 @@ def run() -> None:
             ctx_id=CONFIG.face.insightface_ctx_id,
             det_size=CONFIG.face.insightface_det_size,
             tolerance=CONFIG.face.recognition_tolerance,
+            use_tensorrt=CONFIG.face.insightface_use_tensorrt,
+            detection_scale=CONFIG.face.insightface_detection_scale,
+            recognition_model_path=CONFIG.face.insightface_recognition_model,
+            track_iou_threshold=CONFIG.face.insightface_track_iou_threshold,
+            track_refresh_interval=CONFIG.face.insightface_track_refresh_interval,
         )
         face_controller = FaceController(service=service)
     else:
@@ -83,7 +91,7 @@ def run() -> None:
 
     main_view = MainView(video_view=VideoView(window_title=CONFIG.video.window_title))
 
-    fps_gen = measure_fps()
+    fps_gen = measure_fps(target_fps=CONFIG.video.target_fps)
 
     try:
         for delta, fps in fps_gen:
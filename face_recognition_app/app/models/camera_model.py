@@ -7,9 +7,12 @@ the abstraction instead of raw OpenCV calls (Single Responsibility, DIP).
 
 from __future__ import annotations
 
-from typing import Optional, Protocol, Tuple
+import threading
+from collections import deque
+from typing import Deque, Optional, Protocol, Tuple
 
 import cv2
+from loguru import logger
 
 
 class CameraInterface(Protocol):
@@ -43,3 +46,53 @@ class OpenCVCamera(CameraInterface):
         self._cap.release()
 
 
+class ThreadedCamera(CameraInterface):
+    """
+    Camera decorator that captures frames on a background thread.
+
+    The wrapped camera is read continuously by a daemon thread and only the
+    most recent frame is kept, so grabbing and decoding overlap with frame
+    processing instead of adding to it. Frames that were not consumed in time
+    are dropped.
+    """
+
+    def __init__(self, camera: CameraInterface, read_timeout: float = 1.0) -> None:
+        self._camera = camera
+        self._read_timeout = read_timeout
+        self._frames: Deque[Tuple[bool, "cv2.Mat"]] = deque(maxlen=1)
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._capture_loop, name="camera-capture", daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self) -> None:
+        try:
+            while not self._stopped.is_set():
+                frame = self._camera.read()
+                with self._lock:
+                    self._frames.append(frame)
+                    self._frame_ready.set()
+                if not frame[0]:
+                    # Avoid spinning on a disconnected or busy device
+                    self._stopped.wait(0.01)
+        finally:
+            # Released on the capture thread, after its last read: cv2.VideoCapture
+            # must not be released while another thread is inside read().
+            self._camera.release()
+
+    def read(self) -> Tuple[bool, "cv2.Mat"]:
+        """Return the latest captured frame, waiting for a new one if needed."""
+        if not self._frame_ready.wait(self._read_timeout):
+            return False, None
+        with self._lock:
+            frame = self._frames.pop()
+            self._frame_ready.clear()
+        return frame
+
+    def release(self) -> None:
+        """Stop the capture thread; it releases the wrapped camera on exit."""
+        self._stopped.set()
+        self._thread.join(timeout=self._read_timeout)
+        if self._thread.is_alive():
+            logger.warning("Camera capture thread is still blocked in read(); it will release the camera on return")
@@ -14,6 +14,10 @@ from typing import List, Sequence, Tuple
 import face_recognition
 import numpy as np
 
+from app.utils.distance_kernels import nearest_l2, warmup_nearest_l2
+from app.utils.embedding_cache import gallery_cache_path, load_gallery, save_gallery
+from app.utils.helpers import list_known_face_images, read_ahead
+
 
 @dataclass
 class RecognitionResult:
@@ -46,44 +50,61 @@ class SimpleFaceRecognizer(FaceRecognizerInterface):
 
     known_faces_dir: Path
     tolerance: float = 0.6
-    _encodings: List["np.ndarray"] = field(default_factory=list, init=False)
+    # Known-face encodings as one contiguous (N, 128) float32 matrix, rows parallel to `_names`
+    _gallery: "np.ndarray" = field(default_factory=lambda: np.empty((0, 128), dtype=np.float32), init=False)
+    _gallery_sq_norms: "np.ndarray" = field(default_factory=lambda: np.empty(0, dtype=np.float32), init=False)
     _names: List[str] = field(default_factory=list, init=False)
+    _inv_tolerance: float = field(default=0.0, init=False)
 
     def __post_init__(self) -> None:
+        self._inv_tolerance = 1.0 / self.tolerance
         self._load_known_faces()
+        # Compile the matching kernel now rather than on the first face
+        warmup_nearest_l2(self._gallery.shape[1])
 
     def _load_known_faces(self) -> None:
         if not self.known_faces_dir.exists():
             return
-        for person_dir in self.known_faces_dir.iterdir():
-            if not person_dir.is_dir():
+        cache_path = gallery_cache_path(self.known_faces_dir, "dlib")
+        cached = load_gallery(cache_path)
+        if cached is not None:
+            self._set_gallery(cached[0])
+            self._names = cached[1]
+            return
+        sources = list_known_face_images(self.known_faces_dir)
+        encodings: List["np.ndarray"] = []
+        # Decode images on a thread pool (bounded read-ahead); encodings are computed in file order
+        images = read_ahead([path for _, path in sources], lambda path: face_recognition.load_image_file(str(path)))
+        for (name, _), image in zip(sources, images):
+            encs = face_recognition.face_encodings(image)
+            if not encs:
                 continue
-            name = person_dir.name
-            for image_path in person_dir.glob("*.jpg"):
-                image = face_recognition.load_image_file(str(image_path))
-                encs = face_recognition.face_encodings(image)
-                if not encs:
-                    continue
-                self._encodings.append(encs[0])
-                self._names.append(name)
+            encodings.append(encs[0])
+            self._names.append(name)
+        if encodings:
+            self._set_gallery(np.stack(encodings))
+            save_gallery(cache_path, self._gallery, self._names)
+
+    def _set_gallery(self, encodings: "np.ndarray") -> None:
+        self._gallery = np.ascontiguousarray(encodings, dtype=np.float32)
+        self._gallery_sq_norms = np.einsum("ij,ij->i", self._gallery, self._gallery)
 
     def recognize(
         self,
         frame_rgb: "np.ndarray",
         face_locations: Sequence[Tuple[int, int, int, int]],
     ) -> List[RecognitionResult]:
-        if not self._encodings:
+        if not self._names:
             return [RecognitionResult(name="Unknown", confidence=0.0) for _ in face_locations]
 
         encodings = face_recognition.face_encodings(frame_rgb, face_locations)
         results: List[RecognitionResult] = []
-        for enc in encodings:
-            distances = face_recognition.face_distance(self._encodings, enc)
-            best_index = int(np.argmin(distances))
-            best_distance = float(distances[best_index])
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self._gallery.shape[1])
+        best_indices, best_distances = nearest_l2(self._gallery, self._gallery_sq_norms, queries)
+        for best_index, best_distance in zip(best_indices.tolist(), best_distances.tolist()):
             if best_distance <= self.tolerance:
                 # Convert distance into a simple confidence measure (1 - normalized distance)
-                confidence = max(0.0, min(1.0, 1.0 - best_distance / self.tolerance))
+                confidence = max(0.0, min(1.0, 1.0 - best_distance * self._inv_tolerance))
                 results.append(
                     RecognitionResult(
                         name=self._names[best_index],
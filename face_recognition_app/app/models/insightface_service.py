@@ -10,13 +10,52 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Sequence, Tuple
+from time import perf_counter
+from typing import Any, List, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
+import onnx
+import onnxruntime
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
+from loguru import logger
 
 from app.models.face_recognizer import RecognitionResult
+from app.utils.distance_kernels import nearest_l2, warmup_nearest_l2
+from app.utils.embedding_cache import gallery_cache_path, load_gallery, save_gallery
+from app.utils.helpers import list_known_face_images, read_ahead
+
+# Корневая директория, в которую insightface скачивает пакеты моделей.
+INSIGHTFACE_ROOT = Path("~/.insightface").expanduser()
+
+_GPU_PROVIDERS = ("TensorrtExecutionProvider", "CUDAExecutionProvider")
+
+
+def _is_qoperator_model(model_path: Path) -> bool:
+    """
+    Квантована ли модель в формате QOperator (узлы QLinearConv/QLinearMatMul).
+
+    Такие узлы есть только у CPU EP: на CUDA/TensorRT они исполнялись бы на
+    CPU с копированием тензоров между разделами графа. QDQ-модели состоят из
+    QuantizeLinear/DequantizeLinear и обычных операторов.
+    """
+    model = onnx.load(str(model_path), load_external_data=False)
+    return any(node.op_type.startswith("QLinear") for node in model.graph.node)
+
+
+def _preload_cuda_libraries() -> None:
+    """
+    Загрузить CUDA/cuDNN-библиотеки через torch, если он установлен.
+
+    Без этого ONNXRuntime может не найти DLL CUDA и молча переключиться на
+    CPUExecutionProvider (insightface#2344, #2391). Импорт выполняется только
+    для GPU-режима, чтобы не замедлять старт на CPU.
+    """
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        pass
 
 
 @dataclass
@@ -27,6 +66,28 @@ class InsightFaceRecognizedFace:
     result: RecognitionResult
 
 
+@dataclass
+class _FaceTrack:
+    """Лицо, отслеживаемое между кадрами, с последним результатом распознавания."""
+
+    bbox: "np.ndarray"  # (x1, y1, x2, y2)
+    result: RecognitionResult
+    last_refresh: int  # номер кадра, на котором эмбеддинг считался в последний раз
+
+
+def _iou_matrix(boxes_a: "np.ndarray", boxes_b: "np.ndarray") -> "np.ndarray":
+    """IoU между каждой парой боксов (x1, y1, x2, y2): результат формы (len(a), len(b))."""
+    x1 = np.maximum(boxes_a[:, np.newaxis, 0], boxes_b[np.newaxis, :, 0])
+    y1 = np.maximum(boxes_a[:, np.newaxis, 1], boxes_b[np.newaxis, :, 1])
+    x2 = np.minimum(boxes_a[:, np.newaxis, 2], boxes_b[np.newaxis, :, 2])
+    y2 = np.minimum(boxes_a[:, np.newaxis, 3], boxes_b[np.newaxis, :, 3])
+    intersection = np.clip(x2 - x1, 0.0, None) * np.clip(y2 - y1, 0.0, None)
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, np.newaxis] + area_b[np.newaxis, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+
 @dataclass
 class InsightFaceService:
     """
@@ -43,20 +104,154 @@ class InsightFaceService:
     ctx_id: int = -1  # -1 = CPU, >=0 = GPU index
     det_size: Tuple[int, int] = (640, 640)
     tolerance: float = 0.8  # расстояние/порог для сопоставления эмбеддингов
+    use_tensorrt: bool = False  # TensorRT EP (FP16) поверх CUDA, только при ctx_id >= 0
+    detection_scale: float = 1.0  # масштаб кадра для детекции (< 1.0 — детекция на уменьшенной копии)
+    # Альтернативная (например, INT8-квантованная) ONNX-модель ArcFace вместо модели из пакета
+    recognition_model_path: Optional[Path] = None
+    # Повторное использование результата распознавания для лиц, найденных на
+    # предыдущих кадрах: совпадение по IoU bbox и обновление раз в N кадров (0 — выкл.)
+    track_iou_threshold: float = 0.5
+    track_refresh_interval: int = 30
 
     _app: FaceAnalysis = field(init=False)
-    _encodings: List["np.ndarray"] = field(default_factory=list, init=False)
+    # Матрица L2-нормированных эмбеддингов известных лиц, форма (N, D), float32
+    _gallery: "np.ndarray" = field(default_factory=lambda: np.empty((0, 0), dtype=np.float32), init=False)
+    _gallery_sq_norms: "np.ndarray" = field(default_factory=lambda: np.empty(0, dtype=np.float32), init=False)
     _names: List[str] = field(default_factory=list, init=False)
+    _inv_tolerance: float = field(default=0.0, init=False)  # 1 / tolerance для расчёта confidence
+    _tracks: List[_FaceTrack] = field(default_factory=list, init=False)
+    _frame_index: int = field(default=0, init=False)
 
     def __post_init__(self) -> None:
-        # Инициализируем единственный экземпляр FaceAnalysis
+        if not 0.0 < self.detection_scale <= 1.0:
+            raise ValueError(f"detection_scale must be in (0, 1], got {self.detection_scale}")
+        if self.ctx_id >= 0:
+            _preload_cuda_libraries()
+        # Инициализируем единственный экземпляр FaceAnalysis. Загружаем только
+        # детекцию и ArcFace: остальные модели пакета (landmarks, genderage) не используются.
         self._app = FaceAnalysis(
             name=self.model_pack,
-            providers=["CUDAExecutionProvider", "CPUExecutionProvider"],
+            root=str(INSIGHTFACE_ROOT),
+            allowed_modules=["detection", "recognition"],
+            providers=self._build_providers(),
         )
+        if self.recognition_model_path is not None:
+            self._replace_recognition_session(self.recognition_model_path)
         self._app.prepare(ctx_id=self.ctx_id, det_size=self.det_size)
+        self._inv_tolerance = 1.0 / self.tolerance
+        self._check_providers()
+        self._warmup()
         self._load_known_faces()
 
+    @property
+    def model_dir(self) -> Path:
+        """Директория с ONNX-файлами выбранного пакета моделей."""
+        return INSIGHTFACE_ROOT / "models" / self.model_pack
+
+    @property
+    def trt_cache_dir(self) -> Path:
+        """
+        Директория кэша TensorRT-движков выбранного пакета моделей.
+
+        Лежит вне `model_dir`: insightface не скачивает пакет, если его
+        директория уже существует, поэтому создавать её заранее нельзя.
+        """
+        return INSIGHTFACE_ROOT / "trt_cache" / self.model_pack
+
+    def _build_providers(self, int8: bool = False) -> List[Any]:
+        """
+        Сформировать список execution providers для ONNXRuntime.
+
+        TensorRT EP сам собирает FP16-движки из ONNX-моделей пакета при первом
+        запуске и сериализует их в `trt_cache_dir`, поэтому последующие старты
+        загружают готовые `.engine` без повторной сборки. `int8` разрешает
+        TensorRT исполнять INT8-слои квантованных (QDQ) моделей.
+        """
+        if self.ctx_id < 0:
+            return ["CPUExecutionProvider"]
+
+        providers: List[Any] = []
+        if self.use_tensorrt:
+            cache_dir = self.trt_cache_dir
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            providers.append(
+                (
+                    "TensorrtExecutionProvider",
+                    {
+                        "device_id": self.ctx_id,
+                        "trt_fp16_enable": True,
+                        "trt_int8_enable": int8,
+                        "trt_max_workspace_size": 2 << 30,
+                        "trt_engine_cache_enable": True,
+                        "trt_engine_cache_path": str(cache_dir),
+                    },
+                )
+            )
+        # Кадр намеренно не загружается на GPU заранее (cv2.cuda.GpuMat/BufferPool):
+        # модели insightface получают не сам кадр, а float32-блоб, который
+        # готовится на CPU (resize + blobFromImage), поэтому копия кадра на GPU
+        # не заменила бы ни одной передачи H2D — её делает ORT уже для блоба.
+        providers.append(("CUDAExecutionProvider", {"device_id": self.ctx_id}))
+        providers.append("CPUExecutionProvider")
+        return providers
+
+    def _replace_recognition_session(self, model_path: Path) -> None:
+        """
+        Подменить ONNX-сессию модели распознавания.
+
+        Препроцессинг (mean/std, размер входа) берётся из исходной модели
+        пакета: квантование меняет только веса и операторы, но не вход/выход.
+        """
+        if _is_qoperator_model(model_path):
+            if self.ctx_id >= 0:
+                raise ValueError(
+                    f"{model_path} is a QOperator-quantized model and runs on CPU only. "
+                    "Для GPU квантуйте модель с --format qdq и включите TensorRT."
+                )
+            providers: List[Any] = ["CPUExecutionProvider"]
+        else:
+            providers = self._build_providers(int8=True)
+        recognizer = self._app.models["recognition"]
+        recognizer.session = onnxruntime.InferenceSession(str(model_path), providers=providers)
+        recognizer.input_name = recognizer.session.get_inputs()[0].name
+        recognizer.output_names = [output.name for output in recognizer.session.get_outputs()]
+        logger.info("Using recognition model {}", model_path)
+
+    def _check_providers(self) -> None:
+        """Залогировать активные providers и упасть, если GPU запрошен, но не используется."""
+        for taskname, model in self._app.models.items():
+            active = model.session.get_providers()
+            logger.info("InsightFace '{}' model providers: {}", taskname, active)
+            if self.ctx_id >= 0 and not any(provider in active for provider in _GPU_PROVIDERS):
+                raise RuntimeError(
+                    f"InsightFace '{taskname}' model fell back to {active} although ctx_id={self.ctx_id}. "
+                    "Проверьте установку onnxruntime-gpu и доступность библиотек CUDA/cuDNN "
+                    "или используйте CPU-конфигурацию (ctx_id=-1)."
+                )
+
+    def _warmup(self) -> None:
+        """
+        Прогнать через модели несколько пустых кадров.
+
+        Первые вызовы на CUDA/TensorRT занимают секунды (автотюнинг ядер,
+        выделение памяти, сборка движков), поэтому делаем их заранее, чтобы
+        первый реальный кадр обрабатывался с установившейся задержкой.
+        """
+        iterations = 10 if self.use_tensorrt and self.ctx_id >= 0 else 3
+        dummy = np.zeros((self.det_size[1], self.det_size[0], 3), dtype=np.uint8)
+        # На пустом кадре лиц нет, поэтому модель распознавания прогреваем отдельно
+        recognizer = self._app.models.get("recognition")
+        crop_w, crop_h = recognizer.input_size if recognizer is not None else (112, 112)
+        dummy_crop = np.zeros((crop_h, crop_w, 3), dtype=np.uint8)
+        started = perf_counter()
+        for _ in range(iterations):
+            self._app.get(dummy)
+            if recognizer is not None:
+                recognizer.get_feat(dummy_crop)
+        # Ядро сопоставления с базой (Numba) тоже компилируется при первом вызове
+        warmup_nearest_l2(512)
+        logger.info("InsightFace warm-up: {} iteration(s) in {:.2f} s", iterations, perf_counter() - started)
+
     def _compute_embedding_for_image(self, image_bgr: "np.ndarray") -> "np.ndarray | None":
         """Получить один эмбеддинг лица из изображения (берём самое крупное лицо)."""
         faces = self._app.get(image_bgr)
@@ -70,69 +265,180 @@ class InsightFaceService:
         largest_face = max(faces, key=_area)
         return largest_face.embedding
 
+    def _gallery_cache_tag(self) -> str:
+        """Тег кэша эмбеддингов: пакет моделей и, если задана, заменяющая модель ArcFace."""
+        cache_tag = f"insightface_{self.model_pack}"
+        if self.recognition_model_path is not None:
+            cache_tag += f"_{self.recognition_model_path.stem}"
+        return cache_tag
+
     def _load_known_faces(self) -> None:
         """Собираем базу эмбеддингов известных лиц из директории known_faces."""
         if not self.known_faces_dir.exists():
             return
 
-        for person_dir in self.known_faces_dir.iterdir():
-            if not person_dir.is_dir():
+        # Время изменения заменяющей модели входит в ключ кэша: повторное
+        # квантование перезаписывает файл под тем же именем, а эмбеддинги
+        # старой модели использовать нельзя.
+        model_sources = [self.recognition_model_path] if self.recognition_model_path is not None else []
+        cache_path = gallery_cache_path(self.known_faces_dir, self._gallery_cache_tag(), model_sources)
+        cached = load_gallery(cache_path)
+        if cached is not None:
+            self._set_gallery(cached[0])
+            self._names = cached[1]
+            return
+
+        sources = list_known_face_images(self.known_faces_dir)
+        encodings: List["np.ndarray"] = []
+        # Чтение и декодирование JPEG идёт в пуле потоков (cv2.imread отпускает GIL),
+        # а эмбеддинги считаются последовательно в порядке файлов, чтобы не
+        # конкурировать за сессии ONNXRuntime.
+        images = read_ahead([path for _, path in sources], lambda path: cv2.imread(str(path)))
+        for (name, _), image in zip(sources, images):
+            if image is None:
                 continue
-            name = person_dir.name
-            for image_path in person_dir.glob("*.jpg"):
-                image = cv2.imread(str(image_path))
-                if image is None:
-                    continue
-                embedding = self._compute_embedding_for_image(image)
-                if embedding is None:
-                    continue
-                self._encodings.append(embedding)
-                self._names.append(name)
+            embedding = self._compute_embedding_for_image(image)
+            if embedding is None:
+                continue
+            encodings.append(embedding)
+            self._names.append(name)
+
+        if encodings:
+            self._set_gallery(np.stack(encodings))
+            # На диске база хранится в float16: нормированным эмбеддингам этой
+            # точности хватает, а файл кэша и время его чтения вдвое меньше.
+            save_gallery(cache_path, self._gallery.astype(np.float16), self._names)
+
+    def _set_gallery(self, encodings: "np.ndarray") -> None:
+        """
+        Сохранить базу как C-contiguous float32-матрицу с L2-нормированными строками.
+
+        Сопоставление остаётся во float32: у NumPy нет BLAS-ядер для float16,
+        и матричное умножение в половинной точности на CPU в разы медленнее.
+        """
+        gallery = np.ascontiguousarray(encodings, dtype=np.float32)
+        gallery /= np.linalg.norm(gallery, axis=1, keepdims=True)
+        self._gallery = gallery
+        self._gallery_sq_norms = np.einsum("ij,ij->i", gallery, gallery)
 
     def _match_embedding(self, embedding: "np.ndarray") -> RecognitionResult:
         """Сопоставить эмбеддинг с базой и вернуть имя + confidence."""
-        if not self._encodings:
-            return RecognitionResult(name="Unknown", confidence=0.0)
+        return self._match_embeddings(embedding[np.newaxis, :])[0]
+
+    def _match_embeddings(self, embeddings: "np.ndarray") -> List[RecognitionResult]:
+        """Сопоставить пачку эмбеддингов (K, D) с базой за одно матричное умножение."""
+        if not self._names:
+            return [RecognitionResult(name="Unknown", confidence=0.0) for _ in range(len(embeddings))]
+
+        queries = embeddings.astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        # L2-дистанция между нормированными векторами: одно произведение
+        # (K, D) @ (D, N) с базой или, для маленькой базы, скомпилированный цикл.
+        best_indices, best_distances = nearest_l2(self._gallery, self._gallery_sq_norms, queries)
+        matched = best_distances <= self.tolerance
+        # Чем меньше расстояние, тем выше уверенность.
+        confidences = np.clip(1.0 - best_distances * self._inv_tolerance, 0.0, 1.0)
+
+        results: List[RecognitionResult] = []
+        for best_index, is_matched, confidence in zip(best_indices, matched, confidences):
+            if is_matched:
+                results.append(RecognitionResult(name=self._names[best_index], confidence=float(confidence)))
+            else:
+                results.append(RecognitionResult(name="Unknown", confidence=0.0))
+        return results
+
+    def _detect_faces(self, frame_bgr: "np.ndarray") -> List[Face]:
+        """
+        Найти лица на кадре (только детекция, без эмбеддингов).
+
+        При `detection_scale < 1.0` детекция выполняется на уменьшенной копии
+        кадра, после чего bbox и ключевые точки пересчитываются в координаты
+        исходного кадра.
+        """
+        scale = self.detection_scale
+        image = frame_bgr
+        if scale < 1.0:
+            image = cv2.resize(frame_bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        bboxes, kpss = self._app.det_model.detect(image, max_num=0, metric="default")
+        if scale < 1.0:
+            inv_scale = 1.0 / scale
+            bboxes[:, 0:4] *= inv_scale
+            if kpss is not None:
+                kpss *= inv_scale
 
-        encodings_array = np.stack(self._encodings)  # (N, D)
-        # Эмбеддинги ArcFace обычно L2-нормированы, поэтому можно использовать L2-дистанцию
-        diff = encodings_array - embedding
-        distances = np.linalg.norm(diff, axis=1)
-        best_index = int(np.argmin(distances))
-        best_distance = float(distances[best_index])
+        return [
+            Face(bbox=bboxes[i, 0:4], kps=kpss[i] if kpss is not None else None, det_score=bboxes[i, 4])
+            for i in range(bboxes.shape[0])
+        ]
+
+    def _compute_embedding(self, frame_bgr: "np.ndarray", face: Face) -> "np.ndarray":
+        """
+        Посчитать эмбеддинг ArcFace для найденного лица.
+
+        Выравнивание и ArcFace всегда работают на исходном разрешении кадра,
+        чтобы не терять качество эмбеддингов.
+        """
+        return self._app.models["recognition"].get(frame_bgr, face)
 
-        if best_distance <= self.tolerance:
-            # Чем меньше расстояние, тем выше уверенность.
-            confidence = max(0.0, min(1.0, 1.0 - best_distance / self.tolerance))
-            return RecognitionResult(name=self._names[best_index], confidence=confidence)
+    def _match_tracks(self, faces: Sequence[Face]) -> List[Optional[_FaceTrack]]:
+        """Сопоставить лица кадра с треками предыдущего кадра по IoU (жадно, трек — одному лицу)."""
+        matched: List[Optional[_FaceTrack]] = [None] * len(faces)
+        if not self._tracks or self.track_refresh_interval <= 0:
+            return matched
 
-        return RecognitionResult(name="Unknown", confidence=0.0)
+        ious = _iou_matrix(
+            np.stack([face.bbox for face in faces]),
+            np.stack([track.bbox for track in self._tracks]),
+        )
+        for face_index in range(len(faces)):
+            track_index = int(np.argmax(ious[face_index]))
+            if ious[face_index, track_index] > self.track_iou_threshold:
+                matched[face_index] = self._tracks[track_index]
+                ious[:, track_index] = 0.0
+        return matched
 
     def analyze(self, frame_bgr: "np.ndarray") -> List[InsightFaceRecognizedFace]:
         """
         Выполнить детекцию и распознавание лиц на кадре.
 
+        Эмбеддинги считаются только для новых лиц и для треков, результат
+        которых не обновлялся `track_refresh_interval` кадров; для остальных
+        используется закэшированный результат распознавания.
+
         Возвращает список объектов с координатами лица и результатом распознавания.
         """
-        faces = self._app.get(frame_bgr)
-        results: List[InsightFaceRecognizedFace] = []
+        self._frame_index += 1
+        faces = self._detect_faces(frame_bgr)
+        if not faces:
+            self._tracks = []
+            return []
+
+        tracks = self._match_tracks(faces)
+        stale = [
+            i
+            for i, track in enumerate(tracks)
+            if track is None or self._frame_index - track.last_refresh >= self.track_refresh_interval
+        ]
+        if stale:
+            embeddings = np.stack([self._compute_embedding(frame_bgr, faces[i]) for i in stale])
+            for i, recog in zip(stale, self._match_embeddings(embeddings)):
+                tracks[i] = _FaceTrack(bbox=faces[i].bbox, result=recog, last_refresh=self._frame_index)
 
-        for face in faces:
-            bbox = face.bbox.astype(int)  # (x1, y1, x2, y2)
-            x1, y1, x2, y2 = bbox
+        self._tracks = [track for track in tracks if track is not None]
+        results: List[InsightFaceRecognizedFace] = []
+        for face, track in zip(faces, self._tracks):
+            bbox = face.bbox  # (x1, y1, x2, y2), float
+            track.bbox = bbox
+            # Скалярная распаковка без промежуточного массива от astype(int)
+            x1, y1, x2, y2 = int(bbox[0]), int(bbox[1]), int(bbox[2]), int(bbox[3])
             # Конвертируем в формат (top, right, bottom, left) для совместимости с вью
             top, right, bottom, left = y1, x2, y2, x1
 
-            embedding = face.embedding
-            recog = self._match_embedding(embedding)
-
             results.append(
                 InsightFaceRecognizedFace(
                     box=(top, right, bottom, left),
-                    result=recog,
+                    result=track.result,
                 )
             )
 
         return results
-
-
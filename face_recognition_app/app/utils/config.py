@@ -9,6 +9,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 
 @dataclass(frozen=True)
@@ -20,6 +21,7 @@ class VideoConfig:
     height: int = 480
     window_title: str = "Face Recognition App"
     target_fps: int = 25
+    threaded_capture: bool = True  # read frames on a background thread, keeping only the latest one
 
 
 @dataclass(frozen=True)
@@ -35,6 +37,13 @@ class FaceDetectionConfig:
     insightface_model_pack: str = "buffalo_l"  # 'buffalo_l' (ArcFace r100), 'buffalo_s' (ArcFace r50), etc.
     insightface_ctx_id: int = -1  # -1 = CPU, 0 = GPU:0, 1 = GPU:1, ...
     insightface_det_size: tuple[int, int] = (640, 640)
+    insightface_detection_scale: float = 1.0  # <1.0 runs RetinaFace on a downscaled copy of the frame
+    insightface_track_iou_threshold: float = 0.5  # IoU to treat a face as the same one from the previous frame
+    insightface_track_refresh_interval: int = 30  # frames before a tracked face is re-recognized (0 = every frame)
+    insightface_use_tensorrt: bool = False  # TensorRT FP16 engines (GPU only, engines are cached on first run)
+    # Optional replacement ArcFace model, e.g. data/models/w600k_r50.int8.qoperator.onnx
+    # produced by scripts/quantize_recognition_model.py
+    insightface_recognition_model: Optional[Path] = None
 
 
 @dataclass(frozen=True)
@@ -57,6 +66,7 @@ CPU_CONFIG = AppConfig(
         insightface_model_pack="buffalo_s",  # ArcFace r50 — легче и быстрее, подходит для CPU
         insightface_ctx_id=-1,  # CPU
         insightface_det_size=(480, 480),
+        insightface_use_tensorrt=False,
     ),
 )
 
@@ -71,6 +81,7 @@ GPU_CONFIG = AppConfig(
         insightface_model_pack="buffalo_l",  # ArcFace r100 — максимальная точность, рекомендуется для GPU
         insightface_ctx_id=0,  # GPU:0
         insightface_det_size=(640, 640),
+        insightface_use_tensorrt=True,  # требует onnxruntime-gpu, собранный с TensorRT
     ),
 )
 
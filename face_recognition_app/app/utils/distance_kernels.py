@@ -0,0 +1,107 @@
+"""
+Nearest-neighbour kernels for small embedding galleries.
+
+For a handful of known faces the BLAS matmul path is dominated by dispatch
+overhead, and a compiled double loop that keeps the running minimum in
+registers is faster. The kernel is compiled with Numba when it is installed
+(`pip install face_recognition_app[speedups]`). Recognizers call
+`nearest_l2`, which picks the kernel for small galleries and otherwise
+falls back to the NumPy/BLAS path. Numba compiles lazily on the first call,
+so recognizers call `warmup_nearest_l2` at startup.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on the environment
+    HAVE_NUMBA = False
+
+    def njit(*args: Any, **kwargs: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """Fallback decorator: leave the function as plain Python."""
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            return func
+
+        return decorator
+
+
+# Galleries smaller than this are matched with `argmin_l2` instead of BLAS
+SMALL_GALLERY_SIZE = 64
+
+
+@njit(cache=True, fastmath=True)
+def argmin_l2(gallery: "np.ndarray", queries: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Find the nearest gallery row for every query by L2 distance.
+
+    `gallery` has shape (N, D) and `queries` shape (K, D), N >= 1. Returns
+    (indices, distances), both of length K.
+    """
+    num_queries = queries.shape[0]
+    best_indices = np.zeros(num_queries, dtype=np.int64)
+    best_distances = np.zeros(num_queries, dtype=np.float32)
+    for j in range(num_queries):
+        best_i = 0
+        best_d = 1e30
+        for i in range(gallery.shape[0]):
+            d = 0.0
+            for k in range(gallery.shape[1]):
+                t = gallery[i, k] - queries[j, k]
+                d += t * t
+            if d < best_d:
+                best_d = d
+                best_i = i
+        best_indices[j] = best_i
+        best_distances[j] = np.sqrt(best_d)
+    return best_indices, best_distances
+
+
+def pairwise_l2(gallery: "np.ndarray", gallery_sq_norms: "np.ndarray", queries: "np.ndarray") -> "np.ndarray":
+    """
+    Return the (K, N) matrix of L2 distances between `queries` and `gallery`.
+
+    Uses ||q - g||^2 = ||q||^2 - 2 q.g + ||g||^2, so all K x N dot products
+    are a single matmul; `gallery_sq_norms` are the precomputed ||g||^2.
+    """
+    sq_distances = (
+        np.einsum("ij,ij->i", queries, queries)[:, np.newaxis]
+        - 2.0 * (queries @ gallery.T)
+        + gallery_sq_norms
+    )
+    return np.sqrt(np.maximum(sq_distances, 0.0))
+
+
+def nearest_l2(
+    gallery: "np.ndarray",
+    gallery_sq_norms: "np.ndarray",
+    queries: "np.ndarray",
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Return (indices, distances) of the closest gallery row for each query.
+
+    Small galleries go through the compiled `argmin_l2` kernel when Numba is
+    available; everything else through the BLAS path of `pairwise_l2`.
+    """
+    if HAVE_NUMBA and len(gallery) < SMALL_GALLERY_SIZE:
+        return argmin_l2(gallery, queries)
+    distances = pairwise_l2(gallery, gallery_sq_norms, queries)
+    best_indices = distances.argmin(axis=1)
+    return best_indices, distances[np.arange(len(distances)), best_indices]
+
+
+def warmup_nearest_l2(dim: int) -> None:
+    """
+    Compile `argmin_l2` for the float32 C-contiguous (N, D) arrays recognizers pass.
+
+    The first call with a new signature takes on the order of a second; without
+    this it would land on the first frame that contains a face.
+    """
+    dummy = np.zeros((1, dim), dtype=np.float32)
+    nearest_l2(dummy, np.zeros(1, dtype=np.float32), dummy)
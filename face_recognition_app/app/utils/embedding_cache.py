@@ -0,0 +1,71 @@
+"""
+On-disk cache for known-face embeddings.
+
+Computing embeddings for the whole `known_faces` directory requires running
+face detection and recognition on every image, which dominates startup time
+for large galleries. The cache stores the resulting matrix and names in an
+NPZ file keyed by the paths and modification times of the source images, so
+any added, removed or edited photo invalidates it automatically.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import zipfile
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+
+def gallery_cache_path(known_faces_dir: Path, tag: str, extra_sources: Sequence[Path] = ()) -> Path:
+    """
+    Return the cache file path for the current state of `known_faces_dir`.
+
+    `tag` identifies the embedding backend (e.g. model pack), so caches of
+    different models never collide. `extra_sources` are other files the
+    embeddings depend on (e.g. a model file); their modification times go
+    into the key but not the tag, so a rewritten file still replaces the
+    old cache instead of leaving it behind.
+    """
+    sources = sorted(
+        (str(path.relative_to(known_faces_dir)), path.stat().st_mtime_ns)
+        for path in known_faces_dir.rglob("*.jpg")
+    )
+    extras = [(str(path), path.stat().st_mtime_ns) for path in extra_sources]
+    key = hashlib.sha1(repr((tag, sources, extras)).encode()).hexdigest()
+    return known_faces_dir / f".cache_{tag}_{key}.npz"
+
+
+def load_gallery(path: Path) -> Optional[Tuple["np.ndarray", List[str]]]:
+    """Load (gallery, names) from `path`, or return None if missing or corrupt."""
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            gallery = data["gallery"]
+            names = [str(name) for name in data["names"]]
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile) as exc:
+        logger.warning("Ignoring corrupt embedding cache {}: {}", path, exc)
+        return None
+    if len(gallery) != len(names):
+        logger.warning("Ignoring inconsistent embedding cache {}", path)
+        return None
+    return gallery, names
+
+
+def save_gallery(path: Path, gallery: "np.ndarray", names: Sequence[str]) -> None:
+    """Atomically write (gallery, names) to `path` and drop outdated caches of the same tag."""
+    tag_prefix = path.name.rsplit("_", 1)[0]
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, gallery=gallery, names=np.asarray(names, dtype=str))
+        tmp_path.replace(path)
+        for stale in path.parent.glob(f"{tag_prefix}_*.npz"):
+            # Same prefix and key length: an older cache of the same tag
+            if stale != path and len(stale.name) == len(path.name):
+                stale.unlink()
+    except OSError as exc:
+        logger.warning("Failed to write embedding cache {}: {}", path, exc)
@@ -7,22 +7,87 @@ by models, views and controllers without introducing tight coupling.
 
 from __future__ import annotations
 
-from time import perf_counter
-from typing import Iterator, Tuple
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from time import perf_counter, sleep
+from typing import Callable, Deque, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
+T = TypeVar("T")
 
-def measure_fps() -> Iterator[Tuple[float, float]]:
+
+def smooth_fps(previous_fps: float, instant_fps: float, smoothing: float = 0.9) -> float:
+    """
+    Exponential moving average step for the FPS estimate.
+
+    A zero `previous_fps` means there is no estimate yet, so the first
+    instantaneous rate is taken as is.
+    """
+    if previous_fps == 0.0:
+        return instant_fps
+    return smoothing * previous_fps + (1.0 - smoothing) * instant_fps
+
+
+def measure_fps(target_fps: Optional[float] = None, smoothing: float = 0.9) -> Iterator[Tuple[float, float]]:
     """
     Simple FPS measurement generator.
 
-    Yields tuples of (delta_time_seconds, fps_estimate).
+    Yields tuples of (delta_time_seconds, fps_estimate), where the estimate is
+    an exponential moving average of the instantaneous rate weighted by
+    `smoothing`. If `target_fps` is given, sleeps before yielding so that
+    iterations are not faster than the target rate.
     """
+    frame_budget = 1.0 / target_fps if target_fps else 0.0
+    fps = 0.0
     last_time = perf_counter()
     while True:
         current_time = perf_counter()
+        if current_time - last_time < frame_budget:
+            sleep(frame_budget - (current_time - last_time))
+            current_time = perf_counter()
         delta = current_time - last_time
         last_time = current_time
-        fps = 1.0 / delta if delta > 0 else 0.0
+        if delta > 0:
+            fps = smooth_fps(fps, 1.0 / delta, smoothing)
         yield delta, fps
 
 
+def list_known_face_images(known_faces_dir: Path) -> List[Tuple[str, Path]]:
+    """
+    List (person_name, image_path) pairs of the known faces directory.
+
+    Each subfolder of `known_faces_dir` is a person; its `.jpg` files are
+    photos of that person.
+    """
+    images: List[Tuple[str, Path]] = []
+    for person_dir in known_faces_dir.iterdir():
+        if not person_dir.is_dir():
+            continue
+        for image_path in person_dir.glob("*.jpg"):
+            images.append((person_dir.name, image_path))
+    return images
+
+
+def read_ahead(paths: Sequence[Path], reader: Callable[[Path], T], max_workers: Optional[int] = None) -> Iterator[T]:
+    """
+    Yield `reader(path)` for every path in order, reading on a thread pool.
+
+    At most `2 * max_workers` results are in flight or buffered at a time, so
+    decoding overlaps with whatever the caller does with each result without
+    holding the whole directory in memory.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending: Deque["Future[T]"] = deque()
+        remaining = iter(paths)
+        for path in remaining:
+            pending.append(pool.submit(reader, path))
+            if len(pending) >= 2 * max_workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                pending.append(pool.submit(reader, next_path))
+            yield result
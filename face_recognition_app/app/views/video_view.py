@@ -7,7 +7,7 @@ of how faces are detected or recognized (Single Responsibility).
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Sequence, Tuple
 
 import cv2
@@ -30,6 +30,7 @@ class VideoView:
     """Simple OpenCV-based video window."""
 
     window_title: str = "Face Recognition App"
+    _event_counter: int = field(default=0, init=False)
 
     def show_frame(
         self,
@@ -37,8 +38,13 @@ class VideoView:
         faces: Sequence[VideoOverlayFace],
         fps: float | None = None,
     ) -> None:
-        """Draw overlays and show the frame."""
-        output = frame_bgr.copy()
+        """
+        Draw overlays and show the frame.
+
+        Overlays are drawn in place: the caller hands over the frame and does
+        not use it afterwards, so no per-frame copy is made.
+        """
+        output = frame_bgr
 
         for face in faces:
             top, right, bottom, left = face.box
@@ -57,18 +63,22 @@ class VideoView:
             )
 
         if fps is not None:
-            cv2.putText(
-                output,
-                f"FPS: {fps:.1f}",
-                (10, 20),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (0, 255, 255),
-                2,
-            )
+            self._draw_fps(output, fps)
 
         cv2.imshow(self.window_title, output)
 
+    def _draw_fps(self, output: "np.ndarray", fps: float) -> None:
+        """Draw the FPS label in the top-left corner."""
+        cv2.putText(
+            output,
+            f"FPS: {fps:.1f}",
+            (10, 20),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            (0, 255, 255),
+            2,
+        )
+
     def process_events(self) -> bool:
         """
         Process window events.
@@ -76,11 +86,28 @@ class VideoView:
         Returns True if the app should continue running, False if the user
         requested to quit (e.g., pressed 'q' or ESC).
         """
-        key = cv2.waitKey(1) & 0xFF
+        key = self._poll_key() & 0xFF
         if key in (27, ord("q")):
             return False
         return True
 
+    def _poll_key(self) -> int:
+        """
+        Return the pressed key code (or -1) without sleeping.
+
+        `cv2.pollKey` (OpenCV >= 4.5) handles window events and returns
+        immediately; frame pacing is done by `measure_fps`. Older builds only
+        have `cv2.waitKey`, which sleeps at least one timer tick, so it is
+        called only every other frame.
+        """
+        poll_key = getattr(cv2, "pollKey", None)
+        if poll_key is not None:
+            return poll_key()
+        self._event_counter += 1
+        if self._event_counter % 2:
+            return -1
+        return cv2.waitKey(1)
+
     def close(self) -> None:
         """Destroy OpenCV windows."""
         cv2.destroyAllWindows()
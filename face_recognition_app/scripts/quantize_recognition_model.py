@@ -0,0 +1,121 @@
+"""
+One-off tool: quantize the ArcFace recognition model of an InsightFace pack to INT8.
+
+Calibration uses aligned face crops from the known faces directory, i.e. the
+same preprocessing the recognition model sees at runtime. The result is
+written to `data/models/<model>.int8.<format>.onnx` (outside the insightface pack
+directory, so FaceAnalysis does not pick it up on its own) and is enabled
+via `FaceDetectionConfig.insightface_recognition_model`.
+
+Usage (from the `face_recognition_app` directory, inside .venv):
+
+    python scripts/quantize_recognition_model.py
+    python scripts/quantize_recognition_model.py --format qdq  # for TensorRT INT8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import cv2
+import numpy as np
+from insightface.app import FaceAnalysis
+from insightface.utils import face_align
+from loguru import logger
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+# Add project root (parent of `scripts`) to sys.path so that `import app...` works
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.models.insightface_service import INSIGHTFACE_ROOT  # noqa: E402
+from app.utils.config import CONFIG  # noqa: E402
+
+
+class FaceCropCalibrationReader(CalibrationDataReader):
+    """Feeds preprocessed aligned face crops to the ONNXRuntime calibrator."""
+
+    def __init__(self, input_name: str, blobs: List["np.ndarray"]) -> None:
+        self._input_name = input_name
+        self._blobs: Iterator["np.ndarray"] = iter(blobs)
+
+    def get_next(self) -> Optional[Dict[str, "np.ndarray"]]:
+        blob = next(self._blobs, None)
+        if blob is None:
+            return None
+        return {self._input_name: blob}
+
+
+def _collect_calibration_blobs(app: FaceAnalysis, known_faces_dir: Path, num_samples: int) -> List["np.ndarray"]:
+    """Detect, align and preprocess up to `num_samples` faces from the known faces directory."""
+    recognizer = app.models["recognition"]
+    blobs: List["np.ndarray"] = []
+    for image_path in sorted(known_faces_dir.glob("*/*.jpg")):
+        image = cv2.imread(str(image_path))
+        if image is None:
+            continue
+        for face in app.get(image):
+            crop = face_align.norm_crop(image, landmark=face.kps, image_size=recognizer.input_size[0])
+            blob = cv2.dnn.blobFromImages(
+                [crop],
+                1.0 / recognizer.input_std,
+                recognizer.input_size,
+                (recognizer.input_mean, recognizer.input_mean, recognizer.input_mean),
+                swapRB=True,
+            )
+            blobs.append(blob.astype(np.float32))
+            if len(blobs) >= num_samples:
+                return blobs
+    return blobs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-pack", default=CONFIG.face.insightface_model_pack)
+    parser.add_argument("--known-faces-dir", type=Path, default=CONFIG.face.known_faces_dir)
+    parser.add_argument("--output-dir", type=Path, default=CONFIG.face.model_dir)
+    parser.add_argument("--num-samples", type=int, default=200)
+    parser.add_argument(
+        "--format",
+        choices=("qoperator", "qdq"),
+        default="qoperator",
+        help="qoperator: QLinearConv kernels for CPU; qdq: Q/DQ nodes for TensorRT INT8",
+    )
+    args = parser.parse_args()
+
+    app = FaceAnalysis(
+        name=args.model_pack,
+        root=str(INSIGHTFACE_ROOT),
+        allowed_modules=["detection", "recognition"],
+        providers=["CPUExecutionProvider"],
+    )
+    app.prepare(ctx_id=-1, det_size=(640, 640))
+    recognizer = app.models["recognition"]
+
+    blobs = _collect_calibration_blobs(app, args.known_faces_dir, args.num_samples)
+    if not blobs:
+        raise RuntimeError(f"No faces found for calibration in {args.known_faces_dir}")
+    logger.info("Collected {} calibration crops", len(blobs))
+
+    model_path = Path(recognizer.model_file)
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = args.output_dir / f"{model_path.stem}.int8.{args.format}.onnx"
+    quantize_static(
+        str(model_path),
+        str(output_path),
+        FaceCropCalibrationReader(recognizer.input_name, blobs),
+        quant_format=QuantFormat.QOperator if args.format == "qoperator" else QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    logger.info("Saved INT8 recognition model to {}", output_path)
+
+
+if __name__ == "__main__":
+    main()
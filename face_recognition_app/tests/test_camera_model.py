@@ -0,0 +1,66 @@
+import threading
+from typing import Tuple
+
+from app.models.camera_model import ThreadedCamera
+
+
+class _CountingCamera:
+    """Fake camera returning increasing frame numbers."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.released = False
+
+    def read(self) -> Tuple[bool, int]:
+        self.count += 1
+        return True, self.count
+
+    def release(self) -> None:
+        self.released = True
+
+
+def test_threaded_camera_returns_latest_frames_and_releases_source() -> None:
+    source = _CountingCamera()
+    camera = ThreadedCamera(source)
+    try:
+        ok_first, first = camera.read()
+        ok_second, second = camera.read()
+    finally:
+        camera.release()
+
+    assert ok_first and ok_second
+    assert second > first
+    assert source.released
+
+
+class _BlockingCamera(_CountingCamera):
+    """Fake camera whose read() blocks until allowed, tracking overlap with release()."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.unblock = threading.Event()
+        self.reading = False
+        self.released_during_read = False
+
+    def read(self) -> Tuple[bool, int]:
+        self.reading = True
+        self.unblock.wait()
+        self.reading = False
+        return super().read()
+
+    def release(self) -> None:
+        self.released_during_read = self.reading
+        super().release()
+
+
+def test_threaded_camera_never_releases_during_blocked_read() -> None:
+    source = _BlockingCamera()
+    camera = ThreadedCamera(source, read_timeout=0.05)
+
+    camera.release()  # join times out: the worker is still inside read()
+    assert not source.released
+
+    source.unblock.set()
+    camera._thread.join(timeout=1.0)
+    assert source.released
+    assert not source.released_during_read
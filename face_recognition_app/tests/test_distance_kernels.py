@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from app.utils.distance_kernels import HAVE_NUMBA, argmin_l2, nearest_l2, warmup_nearest_l2
+
+
+def test_argmin_l2_matches_numpy() -> None:
+    rng = np.random.default_rng(0)
+    gallery = rng.normal(size=(10, 512)).astype(np.float32)
+    queries = (gallery[[7, 2, 7]] + rng.normal(scale=0.01, size=(3, 512))).astype(np.float32)
+
+    indices, distances = argmin_l2(gallery, queries)
+
+    expected = np.linalg.norm(queries[:, np.newaxis, :] - gallery[np.newaxis, :, :], axis=2)
+    np.testing.assert_array_equal(indices, [7, 2, 7])
+    np.testing.assert_allclose(distances, expected.min(axis=1), rtol=1e-4)
+
+
+def test_nearest_l2_blas_path_matches_kernel(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = np.random.default_rng(1)
+    gallery = rng.normal(size=(10, 128)).astype(np.float32)
+    sq_norms = np.einsum("ij,ij->i", gallery, gallery)
+    queries = (gallery[[4, 9]] + rng.normal(scale=0.01, size=(2, 128))).astype(np.float32)
+    monkeypatch.setattr("app.utils.distance_kernels.HAVE_NUMBA", False)
+
+    indices, distances = nearest_l2(gallery, sq_norms, queries)
+
+    expected_indices, expected_distances = argmin_l2(gallery, queries)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-3)
+
+
+@pytest.mark.skipif(not HAVE_NUMBA, reason="numba is not installed")
+def test_warmup_compiles_the_recognizer_signature() -> None:
+    warmup_nearest_l2(128)
+
+    # float32, 2-D, C-contiguous: what both recognizers pass at runtime
+    assert any(
+        all(arg.dtype.name == "float32" and arg.ndim == 2 and arg.layout == "C" for arg in signature)
+        for signature in argmin_l2.signatures
+    )
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import numpy as np
+
+from app.utils.embedding_cache import gallery_cache_path, load_gallery, save_gallery
+
+
+def _make_known_faces(root: Path) -> Path:
+    person_dir = root / "Ivan"
+    person_dir.mkdir(parents=True)
+    (person_dir / "1.jpg").write_bytes(b"fake")
+    return root
+
+
+def test_gallery_cache_roundtrip(tmp_path: Path) -> None:
+    known_faces = _make_known_faces(tmp_path)
+    path = gallery_cache_path(known_faces, "test")
+    gallery = np.arange(6, dtype=np.float32).reshape(2, 3)
+
+    save_gallery(path, gallery, ["Ivan", "Ivan"])
+    loaded = load_gallery(path)
+
+    assert loaded is not None
+    np.testing.assert_array_equal(loaded[0], gallery)
+    assert loaded[1] == ["Ivan", "Ivan"]
+
+
+def test_gallery_cache_key_changes_with_sources_and_drops_stale(tmp_path: Path) -> None:
+    known_faces = _make_known_faces(tmp_path)
+    old_path = gallery_cache_path(known_faces, "test")
+    save_gallery(old_path, np.zeros((1, 3), dtype=np.float32), ["Ivan"])
+
+    (known_faces / "Ivan" / "2.jpg").write_bytes(b"fake")
+    new_path = gallery_cache_path(known_faces, "test")
+    save_gallery(new_path, np.zeros((2, 3), dtype=np.float32), ["Ivan", "Ivan"])
+
+    assert new_path != old_path
+    assert not old_path.exists()
+    assert gallery_cache_path(known_faces, "other") != new_path
+
+
+def test_corrupt_gallery_cache_is_ignored(tmp_path: Path) -> None:
+    known_faces = _make_known_faces(tmp_path)
+    path = gallery_cache_path(known_faces, "test")
+    path.write_bytes(b"not an npz file")
+
+    assert load_gallery(path) is None
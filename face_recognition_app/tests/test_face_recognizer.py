@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.models.face_recognizer import RecognitionResult, SimpleFaceRecognizer
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+def test_recognize_matches_names_and_pads_missing_encodings(
+    monkeypatch: pytest.MonkeyPatch, have_numba: bool
+) -> None:
+    recognizer = SimpleFaceRecognizer(known_faces_dir=Path("does-not-exist"))
+    gallery = np.eye(3, 128)
+    recognizer._set_gallery(gallery)
+    recognizer._names = ["Alice", "Bob", "Carol"]
+    near_bob = gallery[1].copy()
+    near_bob[5] = 0.15  # distance 0.15 from Bob
+    stranger = np.eye(1, 128, 10)[0]  # distance sqrt(2) from everyone
+    # Three faces located, but only two of them produced an encoding
+    encodings = [near_bob, stranger]
+    monkeypatch.setattr("app.models.face_recognizer.face_recognition.face_encodings", lambda *args: encodings)
+    monkeypatch.setattr("app.utils.distance_kernels.HAVE_NUMBA", have_numba)
+
+    results = recognizer.recognize(np.zeros((8, 8, 3), dtype=np.uint8), [(0, 4, 4, 0)] * 3)
+
+    assert [result.name for result in results] == ["Bob", "Unknown", "Unknown"]
+    assert results[0].confidence == pytest.approx(1.0 - 0.15 / 0.6, abs=1e-5)
+    assert results[1:] == [RecognitionResult(name="Unknown", confidence=0.0)] * 2
+
+
+def test_recognize_handles_frame_without_encodings(monkeypatch: pytest.MonkeyPatch) -> None:
+    recognizer = SimpleFaceRecognizer(known_faces_dir=Path("does-not-exist"))
+    recognizer._set_gallery(np.eye(2, 128))
+    recognizer._names = ["Alice", "Bob"]
+    monkeypatch.setattr("app.models.face_recognizer.face_recognition.face_encodings", lambda *args: [])
+
+    results = recognizer.recognize(np.zeros((8, 8, 3), dtype=np.uint8), [(0, 4, 4, 0)])
+
+    assert results == [RecognitionResult(name="Unknown", confidence=0.0)]
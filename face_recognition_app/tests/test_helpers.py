@@ -0,0 +1,54 @@
+import threading
+from itertools import accumulate, islice
+from pathlib import Path
+
+import pytest
+
+from app.utils import helpers
+from app.utils.helpers import measure_fps, read_ahead, smooth_fps
+
+
+def test_measure_fps_paces_to_target_rate() -> None:
+    deltas = [delta for delta, _ in islice(measure_fps(target_fps=100), 5)]
+
+    # Every iteration lasts at least the 10 ms frame budget.
+    assert all(delta >= 0.0099 for delta in deltas)
+
+
+def test_smooth_fps_is_exponential_moving_average() -> None:
+    assert smooth_fps(0.0, 30.0) == 30.0  # first sample seeds the estimate
+    assert smooth_fps(30.0, 10.0) == pytest.approx(0.9 * 30.0 + 0.1 * 10.0)
+
+
+def test_measure_fps_damps_a_single_outlier(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Frame timestamps: steady 25 FPS (40 ms) with one 400 ms stall.
+    deltas = [0.04, 0.04, 0.4, 0.04]
+    times = iter([0.0, *accumulate(deltas)])
+    monkeypatch.setattr(helpers, "perf_counter", lambda: next(times))
+    monkeypatch.setattr(helpers, "sleep", lambda seconds: None)
+
+    estimates = [fps for _, fps in islice(measure_fps(), len(deltas))]
+
+    expected = [25.0]
+    for delta in deltas[1:]:
+        expected.append(0.9 * expected[-1] + 0.1 * (1.0 / delta))
+    assert estimates == pytest.approx(expected)
+    # The stall alone would read 2.5 FPS; the smoothed value barely moves.
+    assert estimates[2] == pytest.approx(22.75)
+
+
+def test_read_ahead_keeps_order_and_bounds_in_flight_reads() -> None:
+    paths = [Path(f"{i}.jpg") for i in range(20)]
+    started: list[Path] = []
+    lock = threading.Lock()
+
+    def reader(path: Path) -> str:
+        with lock:
+            started.append(path)
+        return path.stem
+
+    results = read_ahead(paths, reader, max_workers=2)
+    first = next(results)
+    # Only the first 2 * max_workers reads (plus the refill) were submitted
+    assert len(started) <= 5
+    assert [first, *results] == [str(i) for i in range(20)]
@@ -0,0 +1,222 @@
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+import cv2
+import numpy as np
+import onnx
+import pytest
+from onnx import TensorProto, helper
+
+from app.models.insightface_service import InsightFaceService, _is_qoperator_model
+
+
+def _make_service(embeddings: np.ndarray, names: list[str], tolerance: float = 0.8) -> InsightFaceService:
+    """Build a service with a prepared gallery, bypassing model loading."""
+    service = InsightFaceService.__new__(InsightFaceService)
+    service.model_pack = "buffalo_s"
+    service.known_faces_dir = Path("does-not-exist")
+    service.tolerance = tolerance
+    service._inv_tolerance = 1.0 / tolerance
+    service._set_gallery(embeddings)
+    service._names = list(names)
+    return service
+
+
+def test_match_embedding_picks_closest_known_face() -> None:
+    rng = np.random.default_rng(0)
+    gallery = rng.normal(size=(3, 512))
+    service = _make_service(gallery, ["Alice", "Bob", "Carol"])
+
+    # A scaled copy of a gallery vector is at distance 0 after normalization.
+    result = service._match_embedding(gallery[1] * 17.0)
+
+    assert result.name == "Bob"
+    assert result.confidence > 0.99
+
+
+def test_match_embedding_returns_unknown_outside_tolerance() -> None:
+    gallery = np.eye(2, 512)
+    service = _make_service(gallery, ["Alice", "Bob"])
+
+    # Nearest gallery vector is orthogonal: distance sqrt(2), above the tolerance.
+    result = service._match_embedding(-gallery[0])
+
+    assert result.name == "Unknown"
+    assert result.confidence == 0.0
+
+
+def test_match_embeddings_batch_matches_single_queries() -> None:
+    rng = np.random.default_rng(1)
+    gallery = rng.normal(size=(4, 512))
+    service = _make_service(gallery, ["A", "B", "C", "D"])
+    queries = np.stack([gallery[2], -gallery[0], gallery[3] * 0.5])
+
+    batch = service._match_embeddings(queries)
+
+    assert batch == [service._match_embedding(query) for query in queries]
+    assert [result.name for result in batch] == ["C", "Unknown", "D"]
+
+
+class _FakeDetector:
+    """Detector returning fixed boxes (x1, y1, x2, y2, score) and landmarks."""
+
+    def __init__(self, boxes: list, kps: Optional[list] = None) -> None:
+        self.boxes = boxes
+        self.kps = kps
+        self.image_shapes: list[tuple] = []
+
+    def detect(self, img: np.ndarray, max_num: int = 0, metric: str = "default") -> tuple:
+        self.image_shapes.append(img.shape)
+        bboxes = np.array(self.boxes, dtype=np.float32).reshape(-1, 5)
+        if self.kps is None:
+            return bboxes, np.zeros((len(bboxes), 5, 2), dtype=np.float32)
+        return bboxes, np.array(self.kps, dtype=np.float32).reshape(-1, 5, 2)
+
+
+class _FakeRecognizer:
+    """Recognition model returning a fixed embedding and counting calls."""
+
+    def __init__(self, embedding: np.ndarray) -> None:
+        self.embedding = embedding
+        self.calls = 0
+
+    def get(self, img: np.ndarray, face: object) -> np.ndarray:
+        self.calls += 1
+        return self.embedding
+
+
+def test_analyze_reuses_recognition_for_tracked_faces() -> None:
+    gallery = np.eye(2, 512)
+    service = _make_service(gallery, ["Alice", "Bob"])
+    detector = _FakeDetector([[10, 10, 50, 50, 0.9]])
+    recognizer = _FakeRecognizer(gallery[1])
+    service._app = SimpleNamespace(det_model=detector, models={"detection": detector, "recognition": recognizer})
+    service.detection_scale = 1.0
+    service.track_iou_threshold = 0.5
+    service.track_refresh_interval = 3
+    service._tracks = []
+    service._frame_index = 0
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+
+    first = service.analyze(frame)
+    detector.boxes = [[12, 11, 52, 51, 0.9]]  # small motion keeps the track
+    second = service.analyze(frame)
+    service.analyze(frame)
+    assert recognizer.calls == 1
+    service.analyze(frame)  # refresh interval reached
+    assert recognizer.calls == 2
+
+    detector.boxes = [[60, 60, 90, 90, 0.9]]  # no overlap: new face
+    service.analyze(frame)
+    assert recognizer.calls == 3
+
+    assert first[0].result.name == second[0].result.name == "Bob"
+    assert second[0].box == (11, 52, 51, 12)
+
+
+
+def test_detect_faces_maps_downscaled_detections_to_frame() -> None:
+    service = _make_service(np.eye(1, 512), ["Alice"])
+    detector = _FakeDetector([[10, 20, 30, 40, 0.9]], kps=[[[5.0, 6.0]] * 5])
+    service._app = SimpleNamespace(det_model=detector)
+    service.detection_scale = 0.5
+
+    faces = service._detect_faces(np.zeros((100, 200, 3), dtype=np.uint8))
+
+    # Detection ran on the half-size copy; results are in full-frame coordinates
+    assert detector.image_shapes == [(50, 100, 3)]
+    np.testing.assert_allclose(faces[0].bbox, [20, 40, 60, 80])
+    np.testing.assert_allclose(faces[0].kps, [[10.0, 12.0]] * 5)
+    assert faces[0].det_score == pytest.approx(0.9)
+
+
+@pytest.mark.parametrize("scale", [0.0, -0.5, 1.5])
+def test_detection_scale_outside_unit_interval_is_rejected(scale: float) -> None:
+    with pytest.raises(ValueError, match="detection_scale"):
+        InsightFaceService(model_pack="buffalo_s", known_faces_dir=Path("does-not-exist"), detection_scale=scale)
+
+def test_load_known_faces_reads_gallery_and_reuses_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    for name, value in (("Alice", 10), ("Bob", 200)):
+        (tmp_path / name).mkdir()
+        cv2.imwrite(str(tmp_path / name / "1.jpg"), np.full((8, 8, 3), value, dtype=np.uint8))
+    service = _make_service(np.empty((0, 512)), [])
+    service.known_faces_dir = tmp_path
+    service.recognition_model_path = None
+    # Embedding derived from image brightness, so each person gets a distinct vector.
+    compute = lambda image: np.eye(2, 512)[int(image.mean() > 100)]  # noqa: E731
+    monkeypatch.setattr(service, "_compute_embedding_for_image", compute)
+
+    service._load_known_faces()
+    assert sorted(zip(service._names, service._gallery.argmax(axis=1).tolist())) == [("Alice", 0), ("Bob", 1)]
+
+    monkeypatch.setattr(service, "_compute_embedding_for_image", lambda image: None)
+    service._names = []
+    service._load_known_faces()
+    assert sorted(service._names) == ["Alice", "Bob"]
+
+
+def test_build_providers_does_not_create_model_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.models.insightface_service.INSIGHTFACE_ROOT", tmp_path)
+    service = _make_service(np.eye(1, 512), ["Alice"])
+    service.ctx_id = 0
+    service.use_tensorrt = True
+
+    providers = service._build_providers()
+
+    # insightface skips downloading a pack whose directory already exists
+    assert not service.model_dir.exists()
+    assert service.trt_cache_dir.is_dir()
+    assert providers[0][0] == "TensorrtExecutionProvider"
+    assert providers[0][1]["trt_engine_cache_path"] == str(service.trt_cache_dir)
+
+
+def test_requantized_model_replaces_gallery_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    known_faces = tmp_path / "known_faces"
+    (known_faces / "Alice").mkdir(parents=True)
+    cv2.imwrite(str(known_faces / "Alice" / "1.jpg"), np.full((8, 8, 3), 10, dtype=np.uint8))
+    model_path = tmp_path / "w600k_r50.int8.qdq.onnx"
+    model_path.write_bytes(b"model")
+    service = _make_service(np.empty((0, 512)), [])
+    service.known_faces_dir = known_faces
+    service.recognition_model_path = model_path
+    monkeypatch.setattr(service, "_compute_embedding_for_image", lambda image: np.eye(1, 512)[0])
+
+    service._load_known_faces()
+    first_caches = list(known_faces.glob(".cache_*.npz"))
+    # Re-quantizing overwrites the file under the same name
+    os.utime(model_path, ns=(0, model_path.stat().st_mtime_ns + 1_000_000))
+    service._names = []
+    service._load_known_faces()
+
+    caches = list(known_faces.glob(".cache_*.npz"))
+    assert len(first_caches) == 1 and caches != first_caches
+    assert [cache.name.startswith(".cache_insightface_buffalo_s_w600k_r50.int8.qdq_") for cache in caches] == [True]
+
+
+def _save_single_node_model(path: Path, op_type: str, inputs: list[str]) -> Path:
+    """Save a one-node ONNX graph; only the operator types matter for these tests."""
+    node = helper.make_node(op_type, inputs, ["y"])
+    graph = helper.make_graph(
+        [node],
+        "g",
+        [helper.make_tensor_value_info(name, TensorProto.FLOAT, None) for name in inputs],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, None)],
+    )
+    onnx.save(helper.make_model(graph), str(path))
+    return path
+
+
+def test_qoperator_model_is_rejected_on_gpu(tmp_path: Path) -> None:
+    qoperator = _save_single_node_model(tmp_path / "qop.onnx", "QLinearMatMul", list("abcdefgh"))
+    qdq = _save_single_node_model(tmp_path / "qdq.onnx", "DequantizeLinear", ["x", "s"])
+    assert _is_qoperator_model(qoperator)
+    assert not _is_qoperator_model(qdq)
+
+    service = _make_service(np.eye(1, 512), ["Alice"])
+    service.ctx_id = 0
+    service.use_tensorrt = False
+    # QLinear nodes have no CUDA kernels and would silently run on CPU between GPU partitions
+    with pytest.raises(ValueError, match="QOperator"):
+        service._replace_recognition_session(qoperator)
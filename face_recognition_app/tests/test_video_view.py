@@ -0,0 +1,15 @@
+import cv2
+import numpy as np
+
+from app.views.video_view import VideoView
+
+
+def test_fps_label_matches_direct_put_text() -> None:
+    view = VideoView()
+    expected = np.zeros((120, 160, 3), dtype=np.uint8)
+    cv2.putText(expected, "FPS: 24.6", (10, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+
+    output = np.zeros_like(expected)
+    view._draw_fps(output, 24.61)
+    np.testing.assert_array_equal(output, expected)
+